@@ -0,0 +1,56 @@
+# build_bank.py
+"""
+Dựng file ngân hàng câu hỏi dùng chung cho chế độ multi-worker
+- Đọc toàn bộ file CSV và lập chỉ mục câu hỏi trùng lặp (dedup.py) MỘT lần cho mỗi máy
+- Ghi ra một file chỉ đọc; các worker đặt ELEARNING_BANK_FILE trỏ tới file này và chỉ việc nạp lại
+- Ghi vào file tạm rồi đổi tên (os.replace) => worker không bao giờ đọc phải file đang ghi dở
+
+Cách dùng:
+    python build_bank.py --out /tmp/elearning/bank.pkl
+"""
+
+import argparse
+import os
+import pickle
+import stat
+
+from utils import AVAILABLE_FILES, read_questions_csv
+from dedup import build_duplicate_neighbors
+
+def build_bank_file(out_path: str) -> dict:
+    """
+    Load every topic file, build the duplicate index and write the shared bank file.
+
+    Args:
+        out_path (str): Destination path of the bank file.
+
+    Returns:
+        dict: The written snapshot ({"questions": {file_path: [...]}, "duplicate_neighbors": {...}}).
+    """
+    questions = {file_path: read_questions_csv(file_path) for file_path in AVAILABLE_FILES.values()}
+    all_questions = [q for file_questions in questions.values() for q in file_questions]
+    snapshot = {
+        "questions": questions,
+        "duplicate_neighbors": build_duplicate_neighbors(all_questions),
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    os.replace(tmp_path, out_path)
+    return snapshot
+
+def main(argv: list | None = None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Dựng file ngân hàng câu hỏi dùng chung cho các worker.")
+    parser.add_argument("--out", required=True, help="Đường dẫn file ngân hàng (đặt vào ELEARNING_BANK_FILE)")
+    args = parser.parse_args(argv)
+
+    snapshot = build_bank_file(args.out)
+    total = sum(len(file_questions) for file_questions in snapshot['questions'].values())
+    print(f"Đã dựng {args.out}: {len(snapshot['questions'])} chủ đề, {total} câu hỏi")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+# dedup.py
+"""
+Phát hiện câu hỏi gần trùng lặp trên toàn ngân hàng câu hỏi (MinHash/LSH)
+- Chuẩn hóa nội dung câu hỏi + các đáp án, tách thành shingle (cụm 3 từ)
+- MinHash ước lượng độ tương đồng Jaccard; LSH (chia band) chỉ so sánh các cặp ứng viên
+  => thời gian gần tuyến tính theo số câu hỏi thay vì so sánh từng cặp
+- Cụm trùng lặp được gom quanh một câu đại diện; mỗi thành viên phải gần trùng với MỌI thành viên khác
+  (không gom bắc cầu A~B~C) và có cùng nội dung đáp án đúng
+- Kết quả: các cụm trùng lặp kèm độ tương đồng (cho nhóm biên soạn nội dung) và bảng láng giềng qid -> các qid gần trùng
+  (cho bộ sinh đề thi: mọi cặp gần trùng đều bị loại, kể cả cặp không nằm chung cụm)
+
+Cách dùng:
+    python dedup.py --out duplicate_clusters.csv
+"""
+
+import argparse
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils import AVAILABLE_FILES, load_questions, get_bank_snapshot
+
+# ---------- Constants ----------
+SHINGLE_SIZE = 3          # Words per shingle
+NUM_PERM = 128            # MinHash signature length
+LSH_BANDS = 16            # NUM_PERM = LSH_BANDS * LSH_ROWS
+LSH_ROWS = 8
+SIMILARITY_THRESHOLD = 0.8
+MINHASH_SEED = 17
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# ---------- Normalization ----------
+def normalize_text(text) -> str:
+    """
+    Normalize a stem or option for comparison (case, accents form, punctuation, spaces).
+
+    Args:
+        text: Raw CSV cell (may be NaN).
+
+    Returns:
+        str: Normalized text.
+    """
+    if not isinstance(text, str):
+        return ""
+    text = unicodedata.normalize("NFC", text).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+def question_shingles(question: dict) -> set:
+    """
+    Build the shingle set of a question from its stem and options.
+
+    Each field is shingled separately, so the set does not depend on option order.
+
+    Args:
+        question (dict): Question dictionary from load_questions.
+
+    Returns:
+        set: 32-bit shingle hashes.
+    """
+    shingles = set()
+    for field in [question['question']] + list(question['options']):
+        words = normalize_text(field).split()
+        if not words:
+            continue
+        for i in range(max(1, len(words) - SHINGLE_SIZE + 1)):
+            shingles.add(zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8")))
+    return shingles
+
+def correct_answer_text(question: dict) -> str:
+    """Normalized text of the correct option (near-identical stems with different answers are not duplicates)."""
+    options = question['options']
+    index = question['correct_index']
+    return normalize_text(options[index]) if 0 <= index < len(options) else ""
+
+# ---------- MinHash / LSH ----------
+def minhash_signatures(shingle_sets: list) -> np.ndarray:
+    """
+    Compute MinHash signatures for a list of shingle sets.
+
+    Args:
+        shingle_sets (list): One set of 32-bit shingle hashes per document.
+
+    Returns:
+        np.ndarray: Array of shape (len(shingle_sets), NUM_PERM), dtype uint64.
+    """
+    rng = np.random.default_rng(MINHASH_SEED)
+    a = rng.integers(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+    signatures = np.full((len(shingle_sets), NUM_PERM), _MAX_HASH, dtype=np.uint64)
+    for i, shingles in enumerate(shingle_sets):
+        if not shingles:
+            continue
+        hashes = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        permuted = ((np.outer(hashes, a) + b) % _MERSENNE_PRIME) & _MAX_HASH
+        signatures[i] = permuted.min(axis=0)
+    return signatures
+
+def lsh_candidate_pairs(signatures: np.ndarray) -> set:
+    """
+    Find candidate pairs that share at least one LSH band bucket.
+
+    Args:
+        signatures (np.ndarray): MinHash signatures.
+
+    Returns:
+        set: Pairs (i, j) with i < j.
+    """
+    candidates = set()
+    for band in range(LSH_BANDS):
+        buckets = {}
+        band_slice = signatures[:, band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        for i, row in enumerate(band_slice):
+            buckets.setdefault(row.tobytes(), []).append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    candidates.add((members[x], members[y]))
+    return candidates
+
+def find_near_duplicate_pairs(questions: list, threshold: float = SIMILARITY_THRESHOLD) -> dict:
+    """
+    Find every near-duplicate pair of questions.
+
+    A pair counts as near-duplicate when it passes the threshold and has the same correct
+    answer text.
+
+    Args:
+        questions (list): Question dictionaries from load_questions.
+        threshold (float): Minimum estimated Jaccard similarity.
+
+    Returns:
+        dict: Question index -> {neighbour index: estimated similarity}, symmetric.
+    """
+    shingle_sets = [question_shingles(q) for q in questions]
+    answers = [correct_answer_text(q) for q in questions]
+    signatures = minhash_signatures(shingle_sets)
+
+    def similarity(i, j):
+        return float(np.mean(signatures[i] == signatures[j]))
+
+    neighbors = {}
+    for i, j in lsh_candidate_pairs(signatures):
+        if not shingle_sets[i] or not shingle_sets[j] or answers[i] != answers[j]:
+            continue
+        sim = similarity(i, j)
+        if sim >= threshold:
+            neighbors.setdefault(i, {})[j] = sim
+            neighbors.setdefault(j, {})[i] = sim
+    return neighbors
+
+def find_duplicate_clusters(questions: list, threshold: float = SIMILARITY_THRESHOLD) -> list:
+    """
+    Group near-duplicate questions into clusters around a representative.
+
+    Questions with the most near-duplicates become representatives first. A question joins
+    a cluster only if it is a near-duplicate of every member already in it, so clusters
+    never chain through intermediate questions. Some near-duplicate pairs therefore span
+    two clusters, or a cluster and an unclustered question; use find_near_duplicate_pairs
+    when every pair matters.
+
+    Args:
+        questions (list): Question dictionaries from load_questions.
+        threshold (float): Minimum estimated Jaccard similarity.
+
+    Returns:
+        list: Clusters, largest first. Each cluster is a list of (question index, estimated
+            similarity to the representative); the representative comes first with 1.0.
+    """
+    neighbors = find_near_duplicate_pairs(questions, threshold)
+    clusters = []
+    assigned = set()
+    for rep_idx in sorted(neighbors, key=lambda i: (-len(neighbors[i]), i)):
+        if rep_idx in assigned:
+            continue
+        cluster = [(rep_idx, 1.0)]
+        for j, sim in sorted(neighbors[rep_idx].items(), key=lambda item: (-item[1], item[0])):
+            if j in assigned:
+                continue
+            if all(j in neighbors[member] for member, _ in cluster[1:]):
+                cluster.append((j, sim))
+        if len(cluster) > 1:
+            assigned.update(member for member, _ in cluster)
+            clusters.append(cluster)
+    return sorted(clusters, key=len, reverse=True)
+
+# ---------- Bank-wide index ----------
+def load_bank() -> list:
+    """Load every question of every topic file."""
+    questions = []
+    for file_path in AVAILABLE_FILES.values():
+        questions.extend(load_questions(file_path))
+    return questions
+
+def build_duplicate_neighbors(questions: list) -> dict:
+    """
+    Map every question that has a near-duplicate to the qids of all its near-duplicates.
+
+    Args:
+        questions (list): Question dictionaries of the whole bank.
+
+    Returns:
+        dict: qid -> frozenset of neighbour qids.
+    """
+    return {
+        questions[i]['qid']: frozenset(questions[j]['qid'] for j in others)
+        for i, others in find_near_duplicate_pairs(questions).items()
+    }
+
+@st.cache_data(show_spinner="Đang lập chỉ mục câu hỏi trùng lặp...")
+def load_duplicate_neighbors() -> dict:
+    """
+    Load the bank-wide near-duplicate neighbours once per process.
+
+    Uses the prebuilt bank file when configured, otherwise builds them from the CSV files.
+
+    Returns:
+        dict: qid -> frozenset of neighbour qids.
+    """
+    snapshot = get_bank_snapshot()
+    if snapshot is not None and 'duplicate_neighbors' in snapshot:
+        return snapshot['duplicate_neighbors']
+    return build_duplicate_neighbors(load_bank())
+
+def duplicate_clusters_report(threshold: float = SIMILARITY_THRESHOLD) -> pd.DataFrame:
+    """
+    Build a flat report of duplicate clusters for the content team.
+
+    Args:
+        threshold (float): Minimum estimated Jaccard similarity.
+
+    Returns:
+        pd.DataFrame: One row per clustered question, with the cluster representative
+            and the estimated similarity to it.
+    """
+    questions = load_bank()
+    rows = []
+    for cluster_id, members in enumerate(find_duplicate_clusters(questions, threshold)):
+        rep_q = questions[members[0][0]]
+        for i, sim in members:
+            q = questions[i]
+            options = list(q['options']) + [None] * (4 - len(q['options']))
+            rows.append({
+                "cluster": cluster_id,
+                "representative": f"{rep_q['source']}#{rep_q['id']}",
+                "similarity": round(sim, 3),
+                "source": q['source'],
+                "id": q['id'],
+                "cauhoi": q['question'],
+                "dapan1": options[0],
+                "dapan2": options[1],
+                "dapan3": options[2],
+                "dapan4": options[3],
+            })
+    return pd.DataFrame(rows, columns=["cluster", "representative", "similarity", "source", "id", "cauhoi", "dapan1", "dapan2", "dapan3", "dapan4"])
+
+# ---------- Main ----------
+def main(argv: list | None = None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Xuất danh sách cụm câu hỏi gần trùng lặp.")
+    parser.add_argument("--out", default="duplicate_clusters.csv", help="File CSV kết quả")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD, help="Ngưỡng tương đồng Jaccard (0-1)")
+    args = parser.parse_args(argv)
+
+    report = duplicate_clusters_report(args.threshold)
+    report.to_csv(args.out, index=False, encoding="utf-8-sig")
+    print(f"Đã tìm thấy {report['cluster'].nunique() if len(report) else 0} cụm ({len(report)} câu) -> {args.out}")
+
+if __name__ == "__main__":
+    main()
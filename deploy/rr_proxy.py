@@ -0,0 +1,103 @@
+# deploy/rr_proxy.py
+"""
+Proxy round-robin tối giản cho chế độ multi-worker (thay nginx khi chạy thử hoặc kiểm thử)
+- Chuyển tiếp ở mức TCP => HTTP và WebSocket (/_stcore/stream) đều đi qua nguyên vẹn
+- Mỗi kết nối mới đi tới worker kế tiếp, KHÔNG sticky session; worker không kết nối được thì bỏ qua
+- Ghi lại worker đã phục vụ từng kết nối (RoundRobinProxy.served) để kiểm thử biết phiên đã chuyển worker
+
+Cách dùng (từ thư mục gốc của repo, sau khi chạy deploy/run_workers.sh):
+    python deploy/rr_proxy.py --port 8080 --workers 4 --base-port 8501
+"""
+
+import argparse
+import asyncio
+
+_CHUNK_SIZE = 64 * 1024
+
+# ---------- Proxy ----------
+class RoundRobinProxy:
+    """TCP proxy sending each new client connection to the next live backend."""
+
+    def __init__(self, backends: list[tuple[str, int]], host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            backends (list[tuple[str, int]]): Backend (host, port) pairs, in rotation order.
+            host (str): Listen address.
+            port (int): Listen port; 0 picks a free port (read it back from .port after start()).
+        """
+        self.backends = list(backends)
+        self.host = host
+        self.port = port
+        self.served = []  # Backend chosen for each accepted connection, in order
+        self._next = 0
+        self._server = None
+
+    async def start(self):
+        """Start listening."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stop listening."""
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _open_backend(self) -> tuple[tuple[str, int], asyncio.StreamReader, asyncio.StreamWriter]:
+        """Connect to the next backend in rotation, skipping the ones that refuse."""
+        for _ in range(len(self.backends)):
+            backend = self.backends[self._next]
+            self._next = (self._next + 1) % len(self.backends)
+            try:
+                reader, writer = await asyncio.open_connection(*backend)
+            except OSError:
+                continue
+            return backend, reader, writer
+        raise ConnectionError("Không worker nào nhận kết nối")
+
+    async def _handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+        """Pipe one client connection to a backend in both directions."""
+        try:
+            backend, backend_reader, backend_writer = await self._open_backend()
+        except ConnectionError:
+            client_writer.close()
+            return
+        self.served.append(backend)
+        await asyncio.gather(
+            _pipe(client_reader, backend_writer),
+            _pipe(backend_reader, client_writer),
+        )
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Copy bytes from reader to writer until either side closes."""
+    try:
+        while data := await reader.read(_CHUNK_SIZE):
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+# ---------- CLI ----------
+async def _serve(proxy: RoundRobinProxy):
+    """Run the proxy until cancelled."""
+    await proxy.start()
+    print(f"Proxy http://{proxy.host}:{proxy.port} -> {', '.join(f'{h}:{p}' for h, p in proxy.backends)}")
+    await asyncio.Event().wait()
+
+def main(argv: list | None = None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Proxy round-robin cho các worker Streamlit (xem deploy/run_workers.sh).")
+    parser.add_argument("--port", type=int, default=8080, help="Cổng lắng nghe")
+    parser.add_argument("--workers", type=int, default=4, help="Số worker (WORKERS)")
+    parser.add_argument("--base-port", type=int, default=8501, help="Cổng của worker đầu tiên (BASE_PORT)")
+    args = parser.parse_args(argv)
+
+    backends = [("127.0.0.1", args.base_port + i) for i in range(args.workers)]
+    try:
+        asyncio.run(_serve(RoundRobinProxy(backends, port=args.port)))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/bin/sh
+# Chạy nhiều worker Streamlit trên cùng một máy, đặt sau reverse proxy
+# - Sinh $DATA_DIR/nginx.conf từ mẫu deploy/nginx.conf với đúng WORKERS upstream bắt đầu từ BASE_PORT
+# - Dựng file ngân hàng câu hỏi MỘT lần, mọi worker đọc chung (ELEARNING_BANK_FILE)
+# - Trạng thái phiên/bài thi nằm trong SQLite dùng chung (ELEARNING_STATE_DB); khởi tạo và dọn phiên cũ
+#   (không cập nhật quá SESSION_MAX_AGE giây) mỗi lần khởi động
+# - Mọi worker dùng chung cookie secret (STREAMLIT_SERVER_COOKIE_SECRET) để cookie XSRF hợp lệ trên worker bất kỳ
+#
+# Cách dùng (từ thư mục gốc của repo):
+#   WORKERS=4 BASE_PORT=8501 sh deploy/run_workers.sh
+
+set -e
+
+WORKERS=${WORKERS:-4}
+BASE_PORT=${BASE_PORT:-8501}
+APP=${APP:-quiz.py}
+DATA_DIR=${DATA_DIR:-/tmp/elearning}
+SESSION_MAX_AGE=${SESSION_MAX_AGE:-86400}
+export ELEARNING_BANK_FILE=${ELEARNING_BANK_FILE:-$DATA_DIR/bank.pkl}
+export ELEARNING_STATE_DB=${ELEARNING_STATE_DB:-$DATA_DIR/state.db}
+export STREAMLIT_SERVER_COOKIE_SECRET=${STREAMLIT_SERVER_COOKIE_SECRET:-$(python -c "import secrets; print(secrets.token_hex(32))")}
+
+mkdir -p "$DATA_DIR"
+python build_bank.py --out "$ELEARNING_BANK_FILE"
+python state_store.py --purge-max-age "$SESSION_MAX_AGE"
+
+NGINX_CONF="$DATA_DIR/nginx.conf"
+UPSTREAMS=""
+i=0
+while [ "$i" -lt "$WORKERS" ]; do
+    UPSTREAMS="$UPSTREAMS        server 127.0.0.1:$((BASE_PORT + i));\n"
+    i=$((i + 1))
+done
+awk -v servers="$UPSTREAMS" '/^[ \t]*# @UPSTREAM_SERVERS@[ \t]*$/ { printf "%s", servers; next } { print }' \
+    "$(dirname "$0")/nginx.conf" > "$NGINX_CONF"
+echo "Đã sinh $NGINX_CONF ($WORKERS upstream từ cổng $BASE_PORT): nginx -p \"\$PWD\" -c $NGINX_CONF"
+
+trap 'kill 0' INT TERM
+i=0
+while [ "$i" -lt "$WORKERS" ]; do
+    streamlit run "$APP" \
+        --server.port $((BASE_PORT + i)) \
+        --server.headless true &
+    i=$((i + 1))
+done
+wait
@@ -0,0 +1,518 @@
+# export_offline.py
+"""
+Xuất đề thi offline (HTML tĩnh) - dùng khi mạng hoặc máy chủ gặp sự cố tại chi nhánh
+- Mỗi đề được sinh từ (chủ đề, seed) bằng quiz.get_all_questions_for_quiz => luôn dựng lại được đúng đề
+- Mỗi file HTML tự chứa: câu hỏi, đồng hồ đếm ngược, chấm điểm ngay trên trình duyệt (không cần máy chủ)
+- Trang KHÔNG chứa đáp án hay seed: mỗi câu chỉ có mã băm (SHA-256) của vị trí đáp án đúng, trộn với khóa dẫn xuất
+  từ mã mở khóa của đợt xuất đề bằng PBKDF2 (nhiều vòng lặp => dò mã mở khóa offline rất tốn kém).
+  Cán bộ coi thi nhập mã mở khóa (trong manifest.json) sau khi thí sinh nộp bài để hiện điểm
+- Sinh song song hàng trăm đề bằng ProcessPoolExecutor
+- Thứ tự đáp án đảo theo từng đề (cùng mã hoán vị với chế độ thi online), đáp án tính theo vị trí hiển thị
+- manifest.json (chỉ cán bộ coi thi giữ) lưu mã mở khóa, seed, đáp án (answer_key) và mã băm đáp án (answer_key_hash)
+  của từng đề. Chấm lại dùng đáp án trong manifest nên không phụ thuộc ngân hàng câu hỏi hiện tại; --rebuild dựng lại
+  đề từ seed để đối chiếu thêm
+
+Cách dùng:
+    python export_offline.py export --topic 1.tindungkhdn --count 200 --out offline_exams
+    python export_offline.py verify offline_exams/manifest.json ketqua/*.json [--rebuild]
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import math
+import os
+import secrets
+import string
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import AVAILABLE_FILES, get_file_number, code_to_permutation
+from quiz import QUIZ_DURATION_SECONDS, get_all_questions_for_quiz, grade_choices, new_quiz_seed
+
+# ---------- Constants ----------
+MANIFEST_FILENAME = "manifest.json"
+EXPORT_CHUNKSIZE = 8  # Papers handed to a worker process per task
+UNLOCK_CODE_BYTES = 8  # 64-bit unlock code (16 hex characters)
+UNLOCK_KDF_ITERATIONS = 600_000  # PBKDF2-HMAC-SHA256 rounds per unlock attempt, also run by the browser
+UNLOCK_KDF_SALT_PREFIX = "elearning-offline:"  # Salt = prefix + paper id
+
+# ---------- Paper building ----------
+def make_paper_id(topic_path: str) -> str:
+    """
+    Build an opaque paper id (the seed stays in the manifest, never in the page).
+
+    Args:
+        topic_path (str): Path to the selected topic file.
+
+    Returns:
+        str: Paper id, e.g. "1-9f86d081".
+    """
+    topic_number = get_file_number(os.path.basename(topic_path))
+    return f"{topic_number}-{secrets.token_hex(4)}"
+
+def new_unlock_code() -> str:
+    """Generate the unlock code the proctor enters to reveal scores after submission."""
+    return secrets.token_hex(UNLOCK_CODE_BYTES)
+
+def answer_key_hash(paper_id: str, answer_key: list) -> str:
+    """
+    Hash a paper's answer key so exported results can be verified later.
+
+    Args:
+        paper_id (str): Paper id.
+        answer_key (list): Correct option position for every question.
+
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    raw = f"{paper_id}:{','.join(str(k) for k in answer_key)}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+def unlock_key(paper_id: str, unlock_code: str) -> str:
+    """
+    Derive the per-paper grading key from the unlock code (PBKDF2-HMAC-SHA256).
+
+    Every guess of the unlock code costs UNLOCK_KDF_ITERATIONS rounds per paper, so the
+    digests embedded in a page cannot be brute-forced cheaply.
+
+    Args:
+        paper_id (str): Paper id (part of the salt).
+        unlock_code (str): Unlock code of the export batch.
+
+    Returns:
+        str: Derived key as hex.
+    """
+    salt = f"{UNLOCK_KDF_SALT_PREFIX}{paper_id}".encode("utf-8")
+    return hashlib.pbkdf2_hmac("sha256", unlock_code.encode("utf-8"), salt, UNLOCK_KDF_ITERATIONS).hex()
+
+def answer_position_hashes(paper_id: str, answer_key: list, unlock_code: str) -> list:
+    """
+    Hash each correct position with the derived unlock key, so the page can grade without carrying the key.
+
+    The browser derives the same key with crypto.subtle.deriveBits, hashes
+    "<key>:<question>:<position>" for every option and compares it with these digests;
+    without the unlock code they reveal nothing.
+
+    Args:
+        paper_id (str): Paper id.
+        answer_key (list): Correct option position for every question.
+        unlock_code (str): Unlock code of the export batch.
+
+    Returns:
+        list: SHA-256 hex digest per question.
+    """
+    derived = unlock_key(paper_id, unlock_code)
+    return [
+        hashlib.sha256(f"{derived}:{i}:{key}".encode("utf-8")).hexdigest()
+        for i, key in enumerate(answer_key)
+    ]
+
+def _option_text(option) -> str:
+    """Render a CSV cell as text (empty cells are read by pandas as NaN)."""
+    if option is None or (isinstance(option, float) and math.isnan(option)):
+        return ""
+    return str(option)
+
+def build_paper(topic_path: str, seed: int, paper_id: str) -> dict:
+    """
+    Generate one seeded paper from the bank.
+
+    Args:
+        topic_path (str): Path to the selected topic file.
+        seed (int): Paper seed.
+        paper_id (str): Paper id (from make_paper_id or the manifest).
+
+    Returns:
+        dict: Paper with id, seed, questions (options in displayed order) and answer key.
+    """
+    quiz_state = get_all_questions_for_quiz(topic_path, seed=seed)
+    questions = []
+    answer_key = []
+    for q_data in quiz_state:
+        q = q_data['question_data']
+        option_order = code_to_permutation(q_data['option_code'], len(q['options']))
+        questions.append({
+            "question": _option_text(q['question']),
+            "options": [_option_text(q['options'][i]) for i in option_order],
+            "source": q.get('source', 'N/A'),
+        })
+        answer_key.append(q_data['correct_position'])
+    return {
+        "paper_id": paper_id,
+        "topic_path": topic_path,
+        "seed": seed,
+        "questions": questions,
+        "answer_key": answer_key,
+        "answer_key_hash": answer_key_hash(paper_id, answer_key),
+    }
+
+# ---------- HTML rendering ----------
+_PAPER_TEMPLATE = string.Template("""<!DOCTYPE html>
+<html lang="vi">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Đề thi $paper_id</title>
+<style>
+body { font-family: sans-serif; max-width: 860px; margin: 0 auto; padding: 16px; }
+.bar { position: sticky; top: 0; background: #fff; padding: 8px 0; border-bottom: 1px solid #ddd; display: flex; gap: 16px; align-items: center; }
+.timer { font-size: 1.4em; font-weight: bold; color: green; }
+.question { margin: 18px 0; padding-bottom: 12px; border-bottom: 1px solid #eee; }
+.source { color: #666; font-size: 0.85em; }
+label { display: block; padding: 6px; border-radius: 6px; margin-bottom: 4px; cursor: pointer; }
+label.correct { background-color: #d4edda; color: #155724; font-weight: bold; }
+label.wrong { background-color: #f8d7da; color: #721c24; font-weight: bold; }
+#result, #grading { display: none; padding: 12px; background: #eef6ff; border-radius: 6px; margin-top: 8px; }
+#result textarea { width: 100%; height: 90px; font-family: monospace; }
+</style>
+</head>
+<body>
+<h2>🏆 Đề thi offline — $title</h2>
+<p>Mã đề: <b>$paper_id</b> · Thời gian: $duration_minutes phút</p>
+<p><label style="display:inline">Họ tên / Mã nhân viên: <input id="examinee" size="40"></label></p>
+<div class="bar">
+  <span>⏰ Thời gian còn lại: <span id="timer" class="timer"></span></span>
+  <span>Đã trả lời: <span id="answered">0</span>/<span id="total"></span></span>
+  <button id="submit">Nộp bài &amp; Kết thúc</button>
+</div>
+<div id="result"></div>
+<div id="grading">
+  <label style="display:inline">Mã mở khóa (cán bộ coi thi nhập): <input id="unlock" size="16"></label>
+  <button id="unlock_btn">Xem điểm</button>
+  <div id="score"></div>
+</div>
+<div id="questions"></div>
+<script>
+const PAPER = $paper_json;
+const DURATION = $duration_seconds;
+const STORE = "offline_exam_" + PAPER.paper_id;
+const saved = JSON.parse(localStorage.getItem(STORE) || "null") || {start: Date.now(), answers: PAPER.questions.map(() => null), submitted: false};
+const container = document.getElementById("questions");
+document.getElementById("total").textContent = PAPER.questions.length;
+document.getElementById("examinee").value = saved.examinee || "";
+
+function persist() { localStorage.setItem(STORE, JSON.stringify(saved)); }
+
+PAPER.questions.forEach((q, i) => {
+  const div = document.createElement("div");
+  div.className = "question";
+  const head = document.createElement("p");
+  head.innerHTML = "<b>Câu " + (i + 1) + "/" + PAPER.questions.length + ":</b> ";
+  head.appendChild(document.createTextNode(q.question));
+  const src = document.createElement("div");
+  src.className = "source";
+  src.textContent = "Nguồn: " + q.source;
+  div.appendChild(src);
+  div.appendChild(head);
+  q.options.forEach((opt, j) => {
+    const label = document.createElement("label");
+    label.id = "q" + i + "_" + j;
+    const input = document.createElement("input");
+    input.type = "radio";
+    input.name = "q" + i;
+    input.checked = saved.answers[i] === j;
+    input.addEventListener("change", () => { saved.answers[i] = j; persist(); updateAnswered(); });
+    label.appendChild(input);
+    label.appendChild(document.createTextNode(" " + opt));
+    div.appendChild(label);
+  });
+  container.appendChild(div);
+});
+
+function updateAnswered() {
+  document.getElementById("answered").textContent = saved.answers.filter(a => a !== null).length;
+}
+
+function toHex(buffer) {
+  return Array.from(new Uint8Array(buffer), b => b.toString(16).padStart(2, "0")).join("");
+}
+
+async function sha256hex(text) {
+  return toHex(await crypto.subtle.digest("SHA-256", new TextEncoder().encode(text)));
+}
+
+async function unlockKey(code) {
+  // Same PBKDF2-HMAC-SHA256 derivation as export_offline.unlock_key
+  const material = await crypto.subtle.importKey("raw", new TextEncoder().encode(code), "PBKDF2", false, ["deriveBits"]);
+  const salt = new TextEncoder().encode(PAPER.kdf_salt_prefix + PAPER.paper_id);
+  return toHex(await crypto.subtle.deriveBits({name: "PBKDF2", hash: "SHA-256", salt: salt, iterations: PAPER.kdf_iterations}, material, 256));
+}
+
+async function gradeWithCode(code) {
+  // Recover each correct position by hashing every option position with the derived unlock key
+  if (!code) return null;
+  const derived = await unlockKey(code);
+  const key = [];
+  for (let i = 0; i < PAPER.questions.length; i++) {
+    key.push(null);
+    for (let j = 0; j < PAPER.questions[i].options.length; j++) {
+      if (await sha256hex(derived + ":" + i + ":" + j) === PAPER.key_hashes[i]) { key[i] = j; break; }
+    }
+    if (key[i] === null) return null;  // Wrong unlock code
+  }
+  return key;
+}
+
+async function showScore() {
+  const out = document.getElementById("score");
+  if (!window.crypto || !crypto.subtle) { out.textContent = "Trình duyệt không hỗ trợ chấm tại chỗ, điểm sẽ được chấm khi nhập file kết quả."; return; }
+  out.textContent = "Đang kiểm tra mã mở khóa...";
+  const key = await gradeWithCode(document.getElementById("unlock").value.trim());
+  if (key === null) { out.textContent = "Mã mở khóa không đúng."; return; }
+  let score = 0;
+  PAPER.questions.forEach((q, i) => {
+    if (saved.answers[i] === key[i]) score++;
+    document.getElementById("q" + i + "_" + key[i]).className = "correct";
+    if (saved.answers[i] !== null && saved.answers[i] !== key[i]) document.getElementById("q" + i + "_" + saved.answers[i]).className = "wrong";
+  });
+  out.innerHTML = "<h3>✨ Điểm số: " + score + "/" + PAPER.questions.length + "</h3>";
+}
+
+function submitExam() {
+  if (!saved.submitted) { saved.submitted = true; saved.submitted_at = Date.now(); persist(); }
+  document.querySelectorAll("#questions input, #examinee").forEach(el => el.disabled = true);
+  document.getElementById("submit").disabled = true;
+  const result = {
+    paper_id: PAPER.paper_id, answer_key_hash: PAPER.answer_key_hash, examinee: saved.examinee || "",
+    answers: saved.answers, total: PAPER.questions.length,
+    started_at: saved.start, submitted_at: saved.submitted_at,
+  };
+  const text = JSON.stringify(result);
+  document.getElementById("grading").style.display = "block";
+  const box = document.getElementById("result");
+  box.style.display = "block";
+  box.innerHTML = "<h3>✅ Đã nộp bài</h3><p>Gửi file kết quả (hoặc nội dung bên dưới) cho cán bộ coi thi.</p>";
+  const link = document.createElement("a");
+  link.href = URL.createObjectURL(new Blob([text], {type: "application/json"}));
+  link.download = "ketqua_" + PAPER.paper_id + ".json";
+  link.textContent = "⬇️ Tải file kết quả";
+  box.appendChild(link);
+  const area = document.createElement("textarea");
+  area.readOnly = true;
+  area.value = text;
+  box.appendChild(area);
+}
+
+function tick() {
+  if (saved.submitted) return;
+  const remaining = DURATION - (Date.now() - saved.start) / 1000;
+  if (remaining <= 0) { submitExam(); return; }
+  const el = document.getElementById("timer");
+  const m = Math.floor(remaining / 60), s = Math.floor(remaining % 60);
+  el.textContent = String(m).padStart(2, "0") + ":" + String(s).padStart(2, "0");
+  el.style.color = remaining <= 300 ? "red" : remaining <= 600 ? "orange" : "green";
+  setTimeout(tick, 1000);
+}
+
+document.getElementById("examinee").addEventListener("input", e => { saved.examinee = e.target.value; persist(); });
+document.getElementById("submit").addEventListener("click", () => {
+  if (confirm("Bạn có chắc muốn nộp bài?")) submitExam();
+});
+document.getElementById("unlock_btn").addEventListener("click", showScore);
+persist();
+updateAnswered();
+if (saved.submitted) submitExam(); else tick();
+</script>
+</body>
+</html>
+""")
+
+def render_paper_html(paper: dict, title: str, unlock_code: str) -> str:
+    """
+    Render a paper as a self-contained HTML page with timer and grading.
+
+    Only the public part of the paper is embedded: no answer key, no seed.
+
+    Args:
+        paper (dict): Paper built by build_paper.
+        title (str): Topic display name.
+        unlock_code (str): Unlock code of the export batch (hashed, never embedded).
+
+    Returns:
+        str: HTML document.
+    """
+    public_paper = {
+        "paper_id": paper['paper_id'],
+        "questions": paper['questions'],
+        "answer_key_hash": paper['answer_key_hash'],
+        "key_hashes": answer_position_hashes(paper['paper_id'], paper['answer_key'], unlock_code),
+        "kdf_iterations": UNLOCK_KDF_ITERATIONS,
+        "kdf_salt_prefix": UNLOCK_KDF_SALT_PREFIX,
+    }
+    # Escape "</" so question text can never close the <script> block
+    paper_json = json.dumps(public_paper, ensure_ascii=False).replace("</", "<\\/")
+    return _PAPER_TEMPLATE.substitute(
+        paper_id=html.escape(paper['paper_id']),
+        title=html.escape(title),
+        duration_minutes=QUIZ_DURATION_SECONDS // 60,
+        duration_seconds=QUIZ_DURATION_SECONDS,
+        paper_json=paper_json,
+    )
+
+# ---------- Export ----------
+def _export_one(job: tuple) -> dict:
+    """
+    Build, render and write one paper (runs in a worker process).
+
+    Args:
+        job (tuple): (topic_path, title, seed, unlock_code, out_dir).
+
+    Returns:
+        dict: Manifest entry for the paper.
+    """
+    topic_path, title, seed, unlock_code, out_dir = job
+    paper = build_paper(topic_path, seed, make_paper_id(topic_path))
+    filename = f"de_{paper['paper_id']}.html"
+    with open(os.path.join(out_dir, filename), "w", encoding="utf-8") as f:
+        f.write(render_paper_html(paper, title, unlock_code))
+    return {
+        "paper_id": paper['paper_id'],
+        "topic_path": topic_path,
+        "seed": seed,
+        "file": filename,
+        "total": len(paper['answer_key']),
+        "answer_key": paper['answer_key'],
+        "option_counts": [len(q['options']) for q in paper['questions']],
+        "answer_key_hash": paper['answer_key_hash'],
+    }
+
+def export_papers(topic_path: str, seeds: list, out_dir: str, workers: int | None = None) -> dict:
+    """
+    Export one HTML file per seed in parallel and write manifest.json.
+
+    Args:
+        topic_path (str): Path to the selected topic file.
+        seeds (list): Paper seeds to export.
+        out_dir (str): Output directory.
+        workers (int | None): Worker process count (None = CPU count).
+
+    Returns:
+        dict: The manifest (unlock code and one entry per paper).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    title = next((name for name, path in AVAILABLE_FILES.items() if path == topic_path), topic_path)
+    unlock_code = new_unlock_code()
+    jobs = [(topic_path, title, seed, unlock_code, out_dir) for seed in seeds]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        papers = list(pool.map(_export_one, jobs, chunksize=EXPORT_CHUNKSIZE))
+    manifest = {"duration_seconds": QUIZ_DURATION_SECONDS, "unlock_code": unlock_code, "papers": papers}
+    with open(os.path.join(out_dir, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+# ---------- Import / Verify ----------
+def verify_result(result: dict, manifest_entry: dict | None, rebuild: bool = False) -> dict:
+    """
+    Verify a result file against the manifest and re-grade it from the manifest's answer key.
+
+    Args:
+        result (dict): Result JSON downloaded from an offline paper.
+        manifest_entry (dict | None): Matching manifest entry, None if unknown.
+        rebuild (bool): Also rebuild the paper from its seed and require the current bank to
+            yield the same answer key (always done for manifests without an answer key).
+
+    Returns:
+        dict: paper_id, examinee, score, total, valid and reason.
+    """
+    verdict = {
+        "paper_id": result.get('paper_id'),
+        "examinee": result.get('examinee', ''),
+        "score": None,
+        "total": None,
+        "valid": False,
+        "reason": "",
+    }
+    if manifest_entry is None:
+        verdict['reason'] = "Mã đề không có trong manifest"
+        return verdict
+    if result.get('answer_key_hash') != manifest_entry['answer_key_hash']:
+        verdict['reason'] = "Mã băm đáp án không khớp manifest"
+        return verdict
+
+    answer_key = manifest_entry.get('answer_key')
+    option_counts = manifest_entry.get('option_counts')
+    if answer_key is not None:
+        if (answer_key_hash(manifest_entry['paper_id'], answer_key) != manifest_entry['answer_key_hash']
+                or len(option_counts or []) != len(answer_key)):
+            verdict['reason'] = "Đáp án trong manifest không khớp mã băm"
+            return verdict
+    if rebuild or answer_key is None:
+        paper = build_paper(manifest_entry['topic_path'], manifest_entry['seed'], manifest_entry['paper_id'])
+        if paper['answer_key_hash'] != manifest_entry['answer_key_hash']:
+            verdict['reason'] = "Ngân hàng câu hỏi đã thay đổi kể từ khi xuất đề"
+            return verdict
+        answer_key = paper['answer_key']
+        option_counts = [len(q['options']) for q in paper['questions']]
+
+    answers = result.get('answers') or []
+    if len(answers) != len(answer_key):
+        verdict['reason'] = "Số câu trả lời không khớp số câu hỏi"
+        return verdict
+    if any(a is not None and (not isinstance(a, int) or isinstance(a, bool) or not 0 <= a < n) for a, n in zip(answers, option_counts)):
+        verdict['reason'] = "Câu trả lời không hợp lệ"
+        return verdict
+
+    score = int(grade_choices(answers, answer_key).sum())
+    verdict['score'] = score
+    verdict['total'] = len(answer_key)
+    # Result files carry no score (the page cannot grade without the unlock code); check it only if present
+    verdict['valid'] = result.get('score') in (None, score)
+    verdict['reason'] = "" if verdict['valid'] else f"Điểm khai báo ({result.get('score')}) khác điểm chấm lại"
+    return verdict
+
+def verify_results(manifest_path: str, result_paths: list, rebuild: bool = False) -> list:
+    """
+    Verify a batch of result files against a manifest.
+
+    Args:
+        manifest_path (str): Path to manifest.json.
+        result_paths (list): Paths to downloaded result JSON files.
+        rebuild (bool): Also rebuild every paper from its seed (see verify_result).
+
+    Returns:
+        list: One verdict dict per result file.
+    """
+    with open(manifest_path, encoding="utf-8") as f:
+        entries = {entry['paper_id']: entry for entry in json.load(f)['papers']}
+    verdicts = []
+    for path in result_paths:
+        with open(path, encoding="utf-8") as f:
+            result = json.load(f)
+        verdict = verify_result(result, entries.get(result.get('paper_id')), rebuild)
+        verdict['file'] = path
+        verdicts.append(verdict)
+    return verdicts
+
+# ---------- Main ----------
+def main(argv: list | None = None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Xuất đề thi offline (HTML tĩnh) và xác minh kết quả.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="Xuất các đề HTML tĩnh kèm manifest.json")
+    p_export.add_argument("--topic", required=True, choices=[name for name in AVAILABLE_FILES if 1 <= get_file_number(name) <= 16], help="Chủ đề chính (1-16)")
+    p_export.add_argument("--count", type=int, default=100, help="Số đề cần xuất")
+    p_export.add_argument("--seed-start", type=int, default=None, help="Seed của đề đầu tiên (mặc định: ngẫu nhiên)")
+    p_export.add_argument("--out", default="offline_exams", help="Thư mục xuất")
+    p_export.add_argument("--workers", type=int, default=None, help="Số tiến trình song song")
+
+    p_verify = sub.add_parser("verify", help="Xác minh và chấm lại các file kết quả")
+    p_verify.add_argument("manifest", help="Đường dẫn manifest.json")
+    p_verify.add_argument("results", nargs="+", help="Các file ketqua_*.json")
+    p_verify.add_argument("--rebuild", action="store_true", help="Dựng lại đề từ seed và kiểm tra ngân hàng câu hỏi không đổi")
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        seed_start = args.seed_start if args.seed_start is not None else new_quiz_seed()
+        seeds = range(seed_start, seed_start + args.count)
+        manifest = export_papers(AVAILABLE_FILES[args.topic], seeds, args.out, args.workers)
+        print(f"Đã xuất {len(manifest['papers'])} đề vào {args.out}")
+        print(f"Mã mở khóa xem điểm: {manifest['unlock_code']} (chỉ thông báo sau khi thí sinh nộp bài)")
+    else:
+        for verdict in verify_results(args.manifest, args.results, args.rebuild):
+            status = "OK" if verdict['valid'] else f"LỖI: {verdict['reason']}"
+            print(f"{verdict['file']}\t{verdict['paper_id']}\t{verdict['examinee']}\t{verdict['score']}/{verdict['total']}\t{status}")
+
+if __name__ == "__main__":
+    main()
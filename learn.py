@@ -66,10 +66,11 @@ def display_learn_mode(QUESTIONS_DATA, selected_display_name):
     st.subheader(f"Câu hỏi {question_map_index + 1}/{total_questions} (Bộ: {selected_display_name})")
     st.markdown(f"**{question_text}**")
 
-    # Radio buttons
+    # Radio buttons (giá trị là chỉ mục đáp án, không so khớp theo nội dung)
     selected_option = st.radio(
         "Chọn đáp án:",
-        options=options,
+        options=list(range(len(options))),
+        format_func=lambda idx: options[idx],
         index=None, 
         key=f"q_{current_index}_choice",
         disabled=st.session_state['show_result'] 
@@ -79,23 +80,20 @@ def display_learn_mode(QUESTIONS_DATA, selected_display_name):
 
     with col1:
         if selected_option is not None and not st.session_state['show_result']:
-            try:
-                user_index = options.index(selected_option)
-                
-                # Helper function for learn mode to check answer
-                def learn_check_answer(user_index):
-                    current_map_index = st.session_state['question_order'][st.session_state['current_question_index']]
-                    correct_idx = QUESTIONS_DATA[current_map_index]['correct_index']
-                    
-                    st.session_state['user_choice'] = user_index
-                    st.session_state['show_result'] = True
-                
-                    if user_index == correct_idx:
-                        st.session_state['correct_answers'] += 1
+            user_index = selected_option
+            
+            # Helper function for learn mode to check answer
+            def learn_check_answer(user_index):
+                current_map_index = st.session_state['question_order'][st.session_state['current_question_index']]
+                correct_idx = QUESTIONS_DATA[current_map_index]['correct_index']
                 
-                st.button("Kiểm tra đáp án", on_click=learn_check_answer, args=(user_index,), use_container_width=True)
-            except ValueError:
-                st.session_state['show_result'] = False
+                st.session_state['user_choice'] = user_index
+                st.session_state['show_result'] = True
+            
+                if user_index == correct_idx:
+                    st.session_state['correct_answers'] += 1
+            
+            st.button("Kiểm tra đáp án", on_click=learn_check_answer, args=(user_index,), use_container_width=True)
 
     # --- Hiển thị Kết quả và Giải thích ---
     if st.session_state['show_result']:
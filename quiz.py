@@ -6,6 +6,10 @@ Streamlit Quiz (Chế độ Thi - Từng Câu) - Phiên bản tối ưu cho Stre
 - Tối ưu: Giảm kích thước URL, cải thiện đồng hồ đếm ngược, thêm hằng số, tăng cường xử lý lỗi
 - Lưu tạm trạng thái quiz qua URL (base64 JSON, tối ưu dữ liệu)
 - Cache khi load câu hỏi
+- Đề thi sinh theo seed (quiz_seed) để dựng lại đúng đề từ URL và xuất đề offline
+- Không đưa 2 câu gần trùng lặp (theo chỉ mục MinHash/LSH trong dedup.py) vào cùng một đề
+- Đảo thứ tự đáp án theo từng đề (mã hoán vị sinh từ seed), lưu và chấm đáp án theo vị trí hiển thị
+- Chế độ multi-worker (ELEARNING_STATE_DB): trạng thái lưu ở kho dùng chung (state_store.py), URL chỉ giữ mã phiên
 """
 
 import streamlit as st
@@ -14,9 +18,12 @@ import time
 import json
 import base64
 import copy
+import numpy as np
 
 # Import các hàm & dữ liệu chung (giả định có file utils.py)
-from utils import AVAILABLE_FILES, load_questions, get_file_number
+from utils import AVAILABLE_FILES, load_questions, get_file_number, code_to_permutation, random_permutation_code
+from dedup import load_duplicate_neighbors
+import state_store
 
 # ---------- Constants ----------
 N_SELECTED_QUESTIONS = 75
@@ -34,6 +41,31 @@ TOPIC_17_RANGES = [
 # ---------- Helpers: save/load state via URL ----------
 _STATE_QPARAM_KEY = "qs"  # Query param key for quiz state
 _SELECTED_TOPIC_KEY = "st"  # Query param key for selected topic
+_NO_CHOICE_CHAR = "-"  # Unanswered question in the compact choices string
+
+def _encode_choices(choices: list) -> str:
+    """
+    Encode answer positions as one character per question, e.g. [0, None, 3] -> "0-3".
+    
+    Args:
+        choices (list): Answer position per question (None if unanswered).
+    
+    Returns:
+        str: Compact choices string.
+    """
+    return "".join(_NO_CHOICE_CHAR if c is None else str(c) for c in choices)
+
+def _decode_choices(encoded: str) -> list:
+    """
+    Decode a compact choices string back to a list of answer positions.
+    
+    Args:
+        encoded (str): Compact choices string.
+    
+    Returns:
+        list: Answer position per question (None if unanswered).
+    """
+    return [None if c == _NO_CHOICE_CHAR else int(c) for c in encoded]
 
 def _encode_state_for_url(state_dict: dict) -> str:
     """
@@ -66,11 +98,12 @@ def _decode_state_from_url(encoded: str) -> dict | None:
         return None
 
 def save_quiz_state_to_url():
-    """Save minimal quiz state to URL query params (base64 JSON)."""
+    """Save minimal quiz state to URL query params (base64 JSON), or to the shared store in multi-worker mode."""
     if 'quiz_state' not in st.session_state:
         return
     minimal = {
-        "user_choices": [q["user_choice"] for q in st.session_state['quiz_state']],
+        "user_choices": _encode_choices([q["user_choice"] for q in st.session_state['quiz_state']]),
+        "quiz_seed": st.session_state.get('quiz_seed'),
         "quiz_start_time": st.session_state.get('quiz_start_time'),
         "quiz_duration": st.session_state.get('quiz_duration'),
         "quiz_current_q_index": st.session_state.get('quiz_current_q_index'),
@@ -78,12 +111,30 @@ def save_quiz_state_to_url():
         "quiz_score": st.session_state.get('quiz_score', 0),
         "selected_topic_path": st.session_state.get('selected_topic_path'),
     }
+    if state_store.is_enabled():
+        state_store.save_state(state_store.get_session_id(), "quiz", minimal)
+        return
     encoded = _encode_state_for_url(minimal)
     st.query_params.update({_STATE_QPARAM_KEY: encoded})
 
+def _read_saved_quiz_state() -> dict | None:
+    """
+    Read the saved minimal quiz state from the URL or, in multi-worker mode, the shared store.
+    
+    Returns:
+        dict | None: Saved state or None if there is none.
+    """
+    if state_store.is_enabled():
+        sid = state_store.get_session_id(create=False)
+        return state_store.load_state(sid, "quiz") if sid else None
+    params = st.query_params
+    if _STATE_QPARAM_KEY not in params:
+        return None
+    return _decode_state_from_url(params[_STATE_QPARAM_KEY])
+
 def load_quiz_state_from_url(selected_topic_path: str):
     """
-    Load quiz state from URL and reconstruct quiz_state.
+    Load quiz state from URL (or the shared store in multi-worker mode) and reconstruct quiz_state.
     
     Args:
         selected_topic_path (str): Path to the selected topic file.
@@ -91,25 +142,32 @@ def load_quiz_state_from_url(selected_topic_path: str):
     Returns:
         bool: True if state is loaded successfully, False otherwise.
     """
-    params = st.query_params
-    if _STATE_QPARAM_KEY not in params:
-        return False
-    decoded = _decode_state_from_url(params[_STATE_QPARAM_KEY])
+    decoded = _read_saved_quiz_state()
     if not decoded or decoded.get('selected_topic_path') != selected_topic_path:
         return False
     
-    # Reconstruct quiz_state from user_choices
-    quiz_questions = get_all_questions_for_quiz(selected_topic_path)
-    if len(quiz_questions) != len(decoded.get('user_choices', [])):
+    # Reconstruct quiz_state from the paper seed and user_choices
+    quiz_seed = decoded.get('quiz_seed')
+    if quiz_seed is None:
+        return False
+    quiz_questions = get_all_questions_for_quiz(selected_topic_path, seed=quiz_seed)
+    try:
+        user_choices = _decode_choices(decoded.get('user_choices', ""))
+    except (TypeError, ValueError):
+        user_choices = []
+    if len(quiz_questions) != len(user_choices):
         st.error("Trạng thái không hợp lệ: Số câu hỏi không khớp.")
         return False
     
-    for i, choice in enumerate(decoded['user_choices']):
-        quiz_questions[i]['user_choice'] = choice
-        if choice is not None:
-            quiz_questions[i]['is_correct'] = choice == quiz_questions[i]['question_data']['correct_index']
+    for q_data, choice in zip(quiz_questions, user_choices):
+        q_data['user_choice'] = choice
+    is_correct = grade_choices(user_choices, [q_data['correct_position'] for q_data in quiz_questions])
+    for q_data, correct in zip(quiz_questions, is_correct):
+        if q_data['user_choice'] is not None:
+            q_data['is_correct'] = bool(correct)
     
     st.session_state['quiz_state'] = quiz_questions
+    st.session_state['quiz_seed'] = quiz_seed
     st.session_state['quiz_start_time'] = decoded.get('quiz_start_time', time.time())
     st.session_state['quiz_duration'] = decoded.get('quiz_duration', QUIZ_DURATION_SECONDS)
     st.session_state['quiz_current_q_index'] = decoded.get('quiz_current_q_index', 0)
@@ -121,7 +179,11 @@ def load_quiz_state_from_url(selected_topic_path: str):
     return True
 
 def clear_quiz_query_param():
-    """Clear all query parameters."""
+    """Clear the quiz state query param; in multi-worker mode keep the session id so the new exam stays reachable."""
+    if state_store.is_enabled():
+        if _STATE_QPARAM_KEY in st.query_params:
+            del st.query_params[_STATE_QPARAM_KEY]
+        return
     st.query_params.clear()
 
 # ---------- Cache wrapper ----------
@@ -142,16 +204,56 @@ def cached_load_questions(file_path: str) -> list:
         st.error(f"Không thể tải câu hỏi từ {file_path}: {str(e)}")
         return []
 
-def get_all_questions_for_quiz(selected_topic_path: str) -> list:
+def _sample_distinct(rng: random.Random, pool: list, count: int, duplicate_neighbors: dict, picked_qids: set) -> list:
+    """
+    Sample up to `count` questions, skipping near-duplicates of questions already in the paper.
+    
+    Skipped questions are only used as a fallback when the pool has too few distinct ones.
+    
+    Args:
+        rng (random.Random): Paper random generator.
+        pool (list): Candidate question dictionaries.
+        count (int): Number of questions to pick.
+        duplicate_neighbors (dict): qid -> qids of its near-duplicates.
+        picked_qids (set): Qids already in the paper (updated in place).
+    
+    Returns:
+        list: Picked question dictionaries.
+    """
+    picked, skipped = [], []
+    for q in rng.sample(pool, len(pool)):
+        if len(picked) == count:
+            break
+        if not picked_qids.isdisjoint(duplicate_neighbors.get(q.get('qid'), ())):
+            skipped.append(q)
+            continue
+        picked_qids.add(q.get('qid'))
+        picked.append(q)
+    picked.extend(skipped[:count - len(picked)])
+    return picked
+
+def new_quiz_seed() -> int:
+    """Generate a fresh paper seed."""
+    return random.SystemRandom().randrange(2**31)
+
+def get_all_questions_for_quiz(selected_topic_path: str, seed: int | None = None) -> list:
     """
     Select 100 questions: 75 from the chosen topic and 25 from Topic 17.
     
+    The same (topic, seed) pair always yields the same paper, including the
+    per-question option order.
+    
     Args:
         selected_topic_path (str): File path to the selected topic's question file.
+        seed (int | None): Paper seed. None draws an unseeded paper.
     
     Returns:
-        list: List of quiz state dictionaries with question data, user choice, and correctness.
+        list: List of quiz state dictionaries with question data, option permutation
+            code, correct answer position, user choice, and correctness.
     """
+    rng = random.Random(seed)
+    duplicate_neighbors = load_duplicate_neighbors()
+    picked_qids = set()
     pool_selected_topic = cached_load_questions(selected_topic_path)
     selected_topic_name = next((name for name, path in AVAILABLE_FILES.items() if path == selected_topic_path), "Chủ đề đã chọn")
     
@@ -160,7 +262,7 @@ def get_all_questions_for_quiz(selected_topic_path: str) -> list:
         st.warning(f"Cảnh báo: Chỉ có {len(pool_selected_topic)} câu trong **{selected_topic_name}**. Sẽ lấy tất cả.")
     
     # Select questions from chosen topic
-    quiz_q_selected = random.sample(pool_selected_topic, min(N_SELECTED_QUESTIONS, len(pool_selected_topic))) if pool_selected_topic else []
+    quiz_q_selected = _sample_distinct(rng, pool_selected_topic, N_SELECTED_QUESTIONS, duplicate_neighbors, picked_qids)
     
     # Find Topic 17
     topic_17_path = None
@@ -187,13 +289,13 @@ def get_all_questions_for_quiz(selected_topic_path: str) -> list:
                 continue
             if len(sub_list) < count:
                 st.warning(f"Cảnh báo: Chỉ có {len(sub_list)} câu trong Chủ đề 17 (câu {start+1}-{end}). Sẽ lấy tất cả.")
-            quiz_q_17.extend(random.sample(sub_list, min(count, len(sub_list))))
+            quiz_q_17.extend(_sample_distinct(rng, sub_list, count, duplicate_neighbors, picked_qids))
     
     if len(quiz_q_17) < N_TOPIC_17_QUESTIONS:
         st.warning(f"Cảnh báo: Chỉ lấy được {len(quiz_q_17)} câu từ Chủ đề 17.")
     
     final_quiz_questions = quiz_q_selected + quiz_q_17
-    random.shuffle(final_quiz_questions)
+    rng.shuffle(final_quiz_questions)
     
     if not final_quiz_questions:
         st.error("Không có câu hỏi nào được chọn. Vui lòng kiểm tra lại file dữ liệu.")
@@ -203,9 +305,15 @@ def get_all_questions_for_quiz(selected_topic_path: str) -> list:
     for q in final_quiz_questions:
         if 'source' not in q:
             q['source'] = selected_topic_name if q in quiz_q_selected else topic_17_name
+        option_code = random_permutation_code(rng, len(q['options']))
+        if q.get('fixed_order'):
+            option_code = 0  # Identity: options like "Tất cả đáp án trên" refer to positions (the draw above keeps seeds stable)
+        option_order = code_to_permutation(option_code, len(q['options']))
         quiz_state.append({
             "question_data": q,
-            "user_choice": None,
+            "option_code": option_code,  # Displayed position k shows q['options'][option_order[k]]
+            "correct_position": option_order.index(q['correct_index']),
+            "user_choice": None,  # Displayed position chosen by the user
             "is_correct": None,
         })
     return quiz_state
@@ -225,7 +333,8 @@ def init_quiz_state(reset: bool = False):
     if not reset and load_quiz_state_from_url(selected_topic_path):
         return
     
-    st.session_state['quiz_state'] = get_all_questions_for_quiz(selected_topic_path)
+    st.session_state['quiz_seed'] = new_quiz_seed()
+    st.session_state['quiz_state'] = get_all_questions_for_quiz(selected_topic_path, seed=st.session_state['quiz_seed'])
     st.session_state['quiz_total_q'] = len(st.session_state['quiz_state'])
     st.session_state['quiz_start_time'] = time.time()
     st.session_state['quiz_duration'] = QUIZ_DURATION_SECONDS
@@ -237,35 +346,40 @@ def init_quiz_state(reset: bool = False):
     save_quiz_state_to_url()
 
 # ---------- Answer + Submit ----------
-def update_quiz_answer(q_index: int, options_list: list):
+def update_quiz_answer(q_index: int):
     """
-    Save user's answer choice.
+    Save user's answer choice (displayed option position).
     
     Args:
         q_index (int): Index of the current question.
-        options_list (list): List of answer options.
     """
     radio_key = f"quiz_q_{st.session_state['quiz_current_q_index']}"
     if radio_key not in st.session_state:
         return
-    selected_option_text = st.session_state[radio_key]
-    try:
-        user_selected_index = options_list.index(selected_option_text)
-        st.session_state['quiz_state'][q_index]['user_choice'] = user_selected_index
-    except ValueError:
-        st.session_state['quiz_state'][q_index]['user_choice'] = None
+    st.session_state['quiz_state'][q_index]['user_choice'] = st.session_state[radio_key]
     save_quiz_state_to_url()
 
+def grade_choices(choices: list, keys: list) -> np.ndarray:
+    """
+    Compare answer positions with the permuted answer keys in one vectorized step.
+    
+    Args:
+        choices (list): Answer position per question (None if unanswered).
+        keys (list): Correct answer position per question.
+    
+    Returns:
+        np.ndarray: Boolean array, True where the answer is correct.
+    """
+    chosen = np.array([-1 if c is None else c for c in choices], dtype=np.int8)
+    return chosen == np.asarray(keys, dtype=np.int8)
+
 def submit_quiz():
     """Calculate score and finalize quiz."""
-    score = 0
-    for q_data in st.session_state['quiz_state']:
-        user_choice = q_data['user_choice']
-        correct_index = q_data['question_data']['correct_index']
-        q_data['is_correct'] = user_choice is not None and user_choice == correct_index
-        if q_data['is_correct']:
-            score += 1
-    st.session_state['quiz_score'] = score
+    quiz_state = st.session_state['quiz_state']
+    is_correct = grade_choices([q_data['user_choice'] for q_data in quiz_state], [q_data['correct_position'] for q_data in quiz_state])
+    for q_data, correct in zip(quiz_state, is_correct):
+        q_data['is_correct'] = bool(correct)
+    st.session_state['quiz_score'] = int(is_correct.sum())
     st.session_state['quiz_submitted'] = True
     st.session_state['quiz_view_result'] = True
     save_quiz_state_to_url()
@@ -312,7 +426,8 @@ def display_quiz_result(quiz_state: list, total_q: int):
     for i, q_data in enumerate(quiz_state):
         q_num = i + 1
         q = q_data['question_data']
-        correct_index = q['correct_index']
+        option_order = code_to_permutation(q_data['option_code'], len(q['options']))
+        correct_index = q_data['correct_position']
         user_choice = q_data['user_choice']
         is_correct = q_data['is_correct']
         show_correct_detail = True
@@ -322,7 +437,8 @@ def display_quiz_result(quiz_state: list, total_q: int):
         st.markdown(f"<h4 style='color:{header_color};'>{icon} Câu {q_num}/{total_q} (Nguồn: {q.get('source', 'N/A')})</h4>", unsafe_allow_html=True)
         st.markdown(f"**Câu hỏi:** {q['question']}")
 
-        for idx, option in enumerate(q['options']):
+        for idx, option_idx in enumerate(option_order):
+            option = q['options'][option_idx]
             prefix = ""
             style = "padding:6px; border-radius:6px; margin-bottom:4px;"
             if is_correct and idx == user_choice:
@@ -387,15 +503,17 @@ def display_quiz_mode():
     st.info(f"Nguồn: {q.get('source', 'N/A')}")
     st.markdown(f"**{q['question']}**")
 
+    option_order = code_to_permutation(q_data['option_code'], len(q['options']))
     default_index = q_data['user_choice'] if q_data['user_choice'] is not None else None
     radio_key = f"quiz_q_{current_q_index}"
     st.radio(
         "Chọn đáp án:",
-        options=q['options'],
+        options=list(range(len(option_order))),
+        format_func=lambda pos: q['options'][option_order[pos]],
         index=default_index,
         key=radio_key,
         on_change=update_quiz_answer,
-        args=(current_q_index, q['options']),
+        args=(current_q_index,),
     )
 
     col_nav_1, col_nav_2, col_nav_3 = st.columns([1, 1, 1])
@@ -427,6 +545,11 @@ def main():
 
     topic_names = list(topic_1_16.keys())
     selected_name_from_state = st.session_state.get('selected_topic_name')
+    if selected_name_from_state is None:
+        # New session (F5 or another worker): restore the topic of the saved exam
+        saved = _read_saved_quiz_state()
+        saved_path = saved.get('selected_topic_path') if saved else None
+        selected_name_from_state = next((name for name, path in topic_1_16.items() if path == saved_path), None)
     default_index = topic_names.index(selected_name_from_state) if selected_name_from_state in topic_names else 0
 
     st.sidebar.header("Tùy chọn Thi")
@@ -0,0 +1,152 @@
+# state_store.py
+"""
+Kho trạng thái dùng chung giữa nhiều worker Streamlit trên cùng một máy (chế độ multi-worker)
+- Bật khi đặt biến môi trường ELEARNING_STATE_DB (đường dẫn file SQLite); nếu không, ứng dụng giữ trạng thái trên URL như cũ
+- SQLite ở chế độ WAL: nhiều tiến trình đọc/ghi đồng thời an toàn, không cần dịch vụ ngoài
+- Mỗi phiên có mã sid (lưu trên URL) => worker nào nhận request cũng khôi phục được phiên
+- Dọn phiên cũ khi khởi động (deploy/run_workers.sh gọi file này):
+    python state_store.py --purge-max-age 86400
+"""
+
+import argparse
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import streamlit as st
+
+# ---------- Constants ----------
+STATE_DB_ENV = "ELEARNING_STATE_DB"
+SESSION_QPARAM_KEY = "sid"  # Query param key for the shared session id
+_BUSY_TIMEOUT_SECONDS = 5.0
+DEFAULT_MAX_AGE_SECONDS = 24 * 60 * 60  # Sessions idle longer than this are purged
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_state (
+    sid TEXT NOT NULL,
+    namespace TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (sid, namespace)
+)
+"""
+
+# ---------- Connection ----------
+def is_enabled() -> bool:
+    """Return True when the shared state store is configured."""
+    return bool(os.environ.get(STATE_DB_ENV))
+
+_initialized_paths = set()  # Databases whose schema/WAL setup already ran in this process
+_init_lock = threading.Lock()
+
+def _init_db(path: str):
+    """
+    Switch the database to WAL and create the schema, once per process and path.
+    
+    Args:
+        path (str): SQLite database path.
+    """
+    with _init_lock:
+        if path in _initialized_paths:
+            return
+        with closing(sqlite3.connect(path, timeout=_BUSY_TIMEOUT_SECONDS)) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")  # Persistent: stored in the database file
+            conn.execute(_SCHEMA)
+        _initialized_paths.add(path)
+
+def _connect() -> sqlite3.Connection:
+    """
+    Open a connection to the shared store (one per call: Streamlit runs scripts in many threads).
+    
+    Returns:
+        sqlite3.Connection: Open connection with the schema in place.
+    """
+    path = os.environ[STATE_DB_ENV]
+    _init_db(path)
+    return sqlite3.connect(path, timeout=_BUSY_TIMEOUT_SECONDS)
+
+# ---------- Read / Write ----------
+def save_state(sid: str, namespace: str, state: dict):
+    """
+    Save a state dictionary for a session.
+
+    Args:
+        sid (str): Session id.
+        namespace (str): State namespace, e.g. "quiz".
+        state (dict): JSON-serializable state.
+    """
+    data = json.dumps(state, ensure_ascii=False)
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            "INSERT INTO session_state (sid, namespace, data, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (sid, namespace) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+            (sid, namespace, data, time.time()),
+        )
+
+def load_state(sid: str, namespace: str) -> dict | None:
+    """
+    Load a state dictionary for a session.
+
+    Args:
+        sid (str): Session id.
+        namespace (str): State namespace, e.g. "quiz".
+
+    Returns:
+        dict | None: Saved state or None if there is none.
+    """
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT data FROM session_state WHERE sid = ? AND namespace = ?",
+            (sid, namespace),
+        ).fetchone()
+    return json.loads(row[0]) if row else None
+
+def purge_expired(max_age_seconds: float) -> int:
+    """
+    Delete sessions not updated for max_age_seconds.
+
+    Args:
+        max_age_seconds (float): Maximum idle age.
+
+    Returns:
+        int: Number of deleted rows.
+    """
+    with closing(_connect()) as conn, conn:
+        cursor = conn.execute("DELETE FROM session_state WHERE updated_at < ?", (time.time() - max_age_seconds,))
+    return cursor.rowcount
+
+# ---------- Session id ----------
+def get_session_id(create: bool = True) -> str | None:
+    """
+    Return the session id from the URL, creating one if needed.
+
+    Args:
+        create (bool): Create and store a new id in the URL when missing.
+
+    Returns:
+        str | None: Session id, or None if missing and create is False.
+    """
+    sid = st.query_params.get(SESSION_QPARAM_KEY)
+    if sid or not create:
+        return sid
+    sid = secrets.token_urlsafe(16)
+    st.query_params.update({SESSION_QPARAM_KEY: sid})
+    return sid
+
+def main(argv: list | None = None):
+    """Command line entry point: set up the store and purge expired sessions."""
+    parser = argparse.ArgumentParser(description="Khởi tạo kho trạng thái dùng chung và dọn các phiên cũ.")
+    parser.add_argument("--purge-max-age", type=float, default=DEFAULT_MAX_AGE_SECONDS, help="Xóa phiên không cập nhật quá số giây này")
+    args = parser.parse_args(argv)
+
+    if not is_enabled():
+        parser.error(f"Chưa đặt biến môi trường {STATE_DB_ENV}")
+    deleted = purge_expired(args.purge_max_age)
+    print(f"Đã dọn {deleted} phiên cũ trong {os.environ[STATE_DB_ENV]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+# tests/conftest.py
+"""
+Cấu hình chung cho bộ kiểm thử
+- Ứng dụng tìm file CSV theo thư mục hiện tại (utils.AVAILABLE_FILES) => chạy từ thư mục gốc của repo
+"""
+
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.chdir(REPO_DIR)
+sys.path.insert(0, REPO_DIR)
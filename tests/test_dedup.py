@@ -0,0 +1,80 @@
+# tests/test_dedup.py
+"""
+Kiểm tra phát hiện câu hỏi gần trùng lặp (dedup.py) và bộ sinh đề
+- Cụm không gom bắc cầu: mọi cặp thành viên trong một cụm đều vượt ngưỡng tương đồng
+- Bảng láng giềng giữ cả các cặp gần trùng nằm ngoài cụm
+- Không đề thi nào chứa hai câu gần trùng nhau, kể cả giữa chủ đề đã chọn và Chủ đề 17
+"""
+
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from dedup import (
+    SIMILARITY_THRESHOLD, build_duplicate_neighbors, find_duplicate_clusters, load_bank,
+    minhash_signatures, question_shingles,
+)
+from quiz import _sample_distinct, get_all_questions_for_quiz
+from utils import AVAILABLE_FILES
+
+SEEDS = range(5)
+TOPIC_PATHS = [path for path in AVAILABLE_FILES.values() if not path.startswith("17.")]
+
+# Same question in topic 1 and in Topic 17
+KNOWN_DUPLICATE = ("1.tindungkhdn.csv:227", "17.kienthucchung.csv:183")
+UNRELATED = "2.thamdinh.csv:0"
+# Near-duplicates that do not share a cluster (each matches only part of the other's cluster)
+KNOWN_CROSS_CLUSTER_PAIRS = [
+    ("12.nhansutienluong.csv:28", "12.nhansutienluong.csv:29"),
+    ("12.nhansutienluong.csv:27", "12.nhansutienluong.csv:30"),
+]
+
+@pytest.fixture(scope="module")
+def bank():
+    return load_bank()
+
+@pytest.fixture(scope="module")
+def clusters(bank):
+    return [[bank[i]['qid'] for i, _ in members] for members in find_duplicate_clusters(bank)]
+
+@pytest.fixture(scope="module")
+def neighbors(bank):
+    return build_duplicate_neighbors(bank)
+
+def test_known_duplicates_share_a_cluster(clusters):
+    cluster = next(members for members in clusters if KNOWN_DUPLICATE[0] in members)
+    assert KNOWN_DUPLICATE[1] in cluster
+    assert UNRELATED not in cluster
+
+def test_clusters_do_not_chain(bank, clusters):
+    position = {q['qid']: i for i, q in enumerate(bank)}
+    signatures = minhash_signatures([question_shingles(q) for q in bank])
+    for members in clusters:
+        for a, b in itertools.combinations(members, 2):
+            sim = np.mean(signatures[position[a]] == signatures[position[b]])
+            assert sim >= SIMILARITY_THRESHOLD, (a, b, sim)
+
+def test_neighbors_keep_pairs_outside_clusters(clusters, neighbors):
+    for a, b in KNOWN_CROSS_CLUSTER_PAIRS:
+        assert not any(a in members and b in members for members in clusters)
+        assert b in neighbors[a] and a in neighbors[b]
+    assert UNRELATED not in neighbors.get(KNOWN_DUPLICATE[0], ())
+
+@pytest.mark.parametrize("pair", KNOWN_CROSS_CLUSTER_PAIRS)
+def test_sampler_skips_neighbours_outside_clusters(bank, neighbors, pair):
+    by_qid = {q['qid']: q for q in bank}
+    pool = [by_qid[pair[0]], by_qid[pair[1]], by_qid[UNRELATED]]
+    for seed in SEEDS:
+        picked = {q['qid'] for q in _sample_distinct(random.Random(seed), pool, 2, neighbors, set())}
+        assert not set(pair) <= picked, (seed, picked)
+
+@pytest.mark.parametrize("topic_path", TOPIC_PATHS)
+def test_papers_hold_no_near_duplicates(topic_path, neighbors):
+    for seed in SEEDS:
+        qids = [q_data['question_data']['qid'] for q_data in get_all_questions_for_quiz(topic_path, seed=seed)]
+        picked = set(qids)
+        assert len(picked) == len(qids)
+        for qid in qids:
+            assert picked.isdisjoint(neighbors.get(qid, ())), (topic_path, seed, qid)
@@ -0,0 +1,204 @@
+# tests/test_multiworker.py
+"""
+Kiểm tra chế độ multi-worker đầu-cuối: hai tiến trình "streamlit run" thật đặt sau proxy round-robin
+- Dựng file ngân hàng câu hỏi và kho trạng thái SQLite dùng chung trong thư mục tạm
+- Kết nối WebSocket thứ nhất (worker A): chọn chủ đề, bắt đầu thi, trả lời vài câu, chuyển câu
+- Kết nối lại như khi F5 => proxy đưa sang worker B, chỉ mang theo query string (mã phiên "sid")
+  => phải thấy đúng chủ đề, đúng câu hiện tại, đúng số câu đã trả lời và đáp án đã chọn
+"""
+
+import asyncio
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.parse import parse_qs
+
+import pytest
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.asyncio.client import connect as websocket_connect  # requirements-dev.txt
+
+import state_store
+from conftest import REPO_DIR
+
+sys.path.insert(0, os.path.join(REPO_DIR, "deploy"))
+from rr_proxy import RoundRobinProxy
+
+N_WORKERS = 2
+STARTUP_TIMEOUT_SECONDS = 60
+RUN_TIMEOUT_SECONDS = 60
+TOPIC_INDEX = 2  # Pick a topic other than the selectbox default
+N_ANSWERS = 3
+NEXT_LABEL = "Câu tiếp theo ➡️"
+PREV_LABEL = "⬅️ Câu trước"
+START_LABEL = "Bắt đầu Bài Thi Mới (100 câu)"
+
+# ---------- Browser stand-in ----------
+class AppSession:
+    """One WebSocket session driving the app the way the browser does (BackMsg in, ForwardMsg out)."""
+
+    def __init__(self, ws, query_string: str = ""):
+        self.ws = ws
+        self.query_string = query_string
+        self.elements = {}  # delta path -> element proto of the last run
+        self._widget_values = {}  # widget id -> WidgetState, resent on every run like the browser
+
+    async def run(self, triggers: list | None = None):
+        """Rerun the script with the current widget values plus one-shot button triggers."""
+        msg = BackMsg()
+        msg.rerun_script.query_string = self.query_string
+        msg.rerun_script.widget_states.widgets.extend(self._widget_values.values())
+        for button in triggers or []:
+            msg.rerun_script.widget_states.widgets.add(id=button.id, trigger_value=True)
+        await self.ws.send(msg.SerializeToString())
+
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await asyncio.wait_for(self.ws.recv(), RUN_TIMEOUT_SECONDS))
+            kind = fwd.WhichOneof("type")
+            if kind == "new_session":  # Every script run, including the one after st.rerun()
+                self.elements = {}
+            elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                self.elements[tuple(fwd.metadata.delta_path)] = fwd.delta.new_element
+            elif kind == "page_info_changed":
+                self.query_string = fwd.page_info_changed.query_string
+            elif kind == "script_finished" and fwd.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                break
+        errors = [e.exception.message for e in self.elements.values() if e.WhichOneof("type") == "exception"]
+        assert not errors, errors
+
+    def find(self, kind: str, predicate=lambda element: True):
+        """Return the first element of a type ("radio", "button", ...) matching predicate."""
+        for path in sorted(self.elements):
+            element = self.elements[path]
+            if element.WhichOneof("type") == kind and predicate(getattr(element, kind)):
+                return getattr(element, kind)
+        raise AssertionError(f"Không thấy phần tử {kind}")
+
+    def text(self, kind: str) -> list:
+        """Return the bodies of all heading/markdown elements of a type, except the ticking timer."""
+        bodies = [getattr(e, kind).body for _, e in sorted(self.elements.items()) if e.WhichOneof("type") == kind]
+        return [body for body in bodies if "Thời gian còn lại" not in body]
+
+    def button(self, label: str):
+        return self.find("button", lambda b: b.label == label)
+
+    def select(self, widget, option: str):
+        """Set a radio/selectbox by its displayed option label."""
+        self._widget_values[widget.id] = WidgetState(id=widget.id, string_value=option)
+
+    @property
+    def sid(self) -> str | None:
+        return parse_qs(self.query_string).get(state_store.SESSION_QPARAM_KEY, [None])[0]
+
+# ---------- Workers ----------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _wait_healthy(port: int, proc: subprocess.Popen):
+    deadline = time.time() + STARTUP_TIMEOUT_SECONDS
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Worker cổng {port} đã dừng: {proc.stdout.read()}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=2):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError(f"Worker cổng {port} không sẵn sàng")
+
+@pytest.fixture(scope="module")
+def workers(tmp_path_factory):
+    """Build the shared bank, then start N_WORKERS streamlit processes sharing bank, store and cookie secret."""
+    data_dir = tmp_path_factory.mktemp("elearning")
+    env = dict(os.environ)
+    env['ELEARNING_BANK_FILE'] = str(data_dir / "bank.pkl")
+    env['ELEARNING_STATE_DB'] = str(data_dir / "state.db")
+    env['STREAMLIT_SERVER_COOKIE_SECRET'] = secrets.token_hex(32)
+    subprocess.run([sys.executable, "build_bank.py", "--out", env['ELEARNING_BANK_FILE']], cwd=REPO_DIR, env=env, check=True, capture_output=True)
+
+    ports = [_free_port() for _ in range(N_WORKERS)]
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", "quiz.py", "--server.port", str(port),
+             "--server.headless", "true", "--browser.gatherUsageStats", "false"],
+            cwd=REPO_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        )
+        for port in ports
+    ]
+    try:
+        for port, proc in zip(ports, procs):
+            _wait_healthy(port, proc)
+        yield [("127.0.0.1", port) for port in ports], env['ELEARNING_STATE_DB']
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=30)
+
+# ---------- Test ----------
+async def _connect(proxy: RoundRobinProxy):
+    url = f"ws://127.0.0.1:{proxy.port}/_stcore/stream"
+    return await websocket_connect(url, subprotocols=["streamlit"], max_size=None)
+
+async def _exam_survives_worker_switch(backends: list, state_db: str, monkeypatch):
+    proxy = RoundRobinProxy(backends)
+    await proxy.start()
+    try:
+        # Worker A: pick a topic, start, answer N_ANSWERS questions moving forward each time
+        async with await _connect(proxy) as ws:
+            first = AppSession(ws)
+            await first.run()
+            topic_box = first.find("selectbox")
+            topic = topic_box.options[TOPIC_INDEX]
+            first.select(topic_box, topic)
+            await first.run()
+            await first.run(triggers=[first.button(START_LABEL)])
+            assert first.sid, "Mã phiên phải có trên URL ngay sau khi bắt đầu thi"
+            sid = first.sid
+
+            answers = []
+            for _ in range(N_ANSWERS):
+                radio = first.find("radio")
+                answers.append(radio.options[len(answers) % len(radio.options)])
+                first.select(radio, answers[-1])
+                await first.run()
+                await first.run(triggers=[first.button(NEXT_LABEL)])
+            question_text = first.text("markdown")
+            assert f"Câu hỏi {N_ANSWERS + 1}/100" in first.text("heading")
+            query_string = first.query_string
+
+        # Worker B: a fresh connection (F5) with only the URL query string
+        async with await _connect(proxy) as ws:
+            second = AppSession(ws, query_string)
+            await second.run()
+            assert second.sid == sid
+            assert second.find("selectbox").default == TOPIC_INDEX
+            assert f"Câu hỏi {N_ANSWERS + 1}/100" in second.text("heading")
+            assert second.text("markdown") == question_text
+            assert any(f"**Đã trả lời:** {N_ANSWERS}/100" in body for body in second.text("markdown"))
+
+            await second.run(triggers=[second.button(PREV_LABEL)])
+            radio = second.find("radio")
+            assert radio.options[radio.default] == answers[-1]
+
+        assert proxy.served[0] != proxy.served[1], f"Proxy phải chuyển phiên sang worker khác: {proxy.served}"
+    finally:
+        await proxy.close()
+
+    monkeypatch.setenv(state_store.STATE_DB_ENV, state_db)
+    saved = state_store.load_state(sid, "quiz")
+    assert saved['quiz_current_q_index'] == N_ANSWERS - 1
+    assert saved['selected_topic_path'].startswith(topic)
+
+def test_exam_survives_worker_switch(workers, monkeypatch):
+    backends, state_db = workers
+    asyncio.run(_exam_survives_worker_switch(backends, state_db, monkeypatch))
@@ -5,6 +5,10 @@ import pandas as pd
 import glob 
 import os
 import re
+import math
+import pickle
+import functools
+import unicodedata
 
 # --- 1. TÌM KIẾM VÀ CẤU HÌNH FILE CSV ---
 
@@ -21,11 +25,56 @@ def get_available_files():
 
 AVAILABLE_FILES = get_available_files()
 
+# Chế độ multi-worker: đường dẫn file ngân hàng câu hỏi dựng sẵn (xem build_bank.py)
+BANK_FILE_ENV = "ELEARNING_BANK_FILE"
+
 # --- 2. HÀM TẢI DỮ LIỆU TỪ CSV ---
 
+@functools.lru_cache(maxsize=1)
+def _read_bank_file(bank_file):
+    """Đọc file ngân hàng câu hỏi dựng sẵn (chỉ đọc, mỗi tiến trình đọc một lần)."""
+    with open(bank_file, 'rb') as f:
+        return pickle.load(f)
+
+def get_bank_snapshot():
+    """Trả về ngân hàng câu hỏi dựng sẵn nếu đặt ELEARNING_BANK_FILE, ngược lại None."""
+    bank_file = os.environ.get(BANK_FILE_ENV)
+    if not bank_file or not os.path.exists(bank_file):
+        return None
+    return _read_bank_file(bank_file)
+
 @st.cache_data(show_spinner="Đang tải dữ liệu...")
 def load_questions(file_path):
-    """Tải dữ liệu câu hỏi từ file CSV và xử lý thành danh sách."""
+    """Tải danh sách câu hỏi (từ file ngân hàng dựng sẵn nếu có, ngược lại từ file CSV)."""
+    snapshot = get_bank_snapshot()
+    if snapshot is not None and file_path in snapshot['questions']:
+        return snapshot['questions'][file_path]
+    return read_questions_csv(file_path)
+
+# Đáp án tham chiếu vị trí các đáp án khác ("Tất cả đáp án trên", "Cả 1 và 2", ...): không được xáo trộn thứ tự
+_POSITIONAL_OPTION_PATTERN = re.compile(
+    r"^(bao gồm |gồm )?(tất cả|cả (hai|ba|\d+))\b.*\b(trên|đúng|sai)$"
+    r"|\bđ\w+p án\b"
+    r"|\b[1-4] (và|hoặc) [1-4]\b"
+    r"|\b[1-4] [1-4]( và)? [1-4]\b"
+    r"|\bcả [1-4] [1-4]\b"
+    r"|^(bao gồm |gồm )(tất cả )?các \w+( \w+)? trên$"
+    r"|\b(một|1) trong (hai|ba|[2-4])\b.*\btrên$"
+    r"|^cả (hai|ba|[2-4])( \w+){1,2}$"
+    r"|^(bao gồm |gồm )?(tất cả|cả (hai|ba|\d+))( các)? (đáp án|phương án|ý|nội dung)"
+)
+_POSITIONAL_OPTION_MAX_WORDS = 12
+
+def is_positional_option(option):
+    """Kiểm tra đáp án có tham chiếu tới vị trí các đáp án khác hay không."""
+    if not isinstance(option, str):
+        return False
+    text = unicodedata.normalize("NFC", option).lower()
+    text = re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", text)).strip()
+    return len(text.split()) <= _POSITIONAL_OPTION_MAX_WORDS and bool(_POSITIONAL_OPTION_PATTERN.search(text))
+
+def read_questions_csv(file_path):
+    """Đọc dữ liệu câu hỏi từ file CSV và xử lý thành danh sách."""
     
     if not os.path.exists(file_path):
         return []
@@ -53,12 +102,20 @@ def load_questions(file_path):
         except:
             correct_index = 0
             
+        options = [row['dapan1'], row['dapan2'], row['dapan3'], row['dapan4']]
+        # Bỏ các ô đáp án trống ở cuối (câu hỏi chỉ có 2 hoặc 3 đáp án)
+        while len(options) > correct_index + 1 and pd.isna(options[-1]):
+            options.pop()
+            
         question = {
+            "qid": f"{os.path.basename(file_path)}:{index}", # Mã duy nhất trên toàn ngân hàng
+            "id": row['id'],
             "question": row['cauhoi'],
-            "options": [row['dapan1'], row['dapan2'], row['dapan3'], row['dapan4']],
+            "options": options,
             "correct_index": correct_index,
             "explanation": row['trichdan'],
-            "source": os.path.basename(file_path) # Thêm nguồn file
+            "source": os.path.basename(file_path), # Thêm nguồn file
+            "fixed_order": any(is_positional_option(o) for o in options) # Giữ nguyên thứ tự đáp án
         }
         questions_list.append(question)
         
@@ -69,4 +126,19 @@ def get_file_number(display_name):
     match = re.match(r'(\d+)\.', display_name)
     if match:
         return int(match.group(1))
-    return None
\ No newline at end of file
+    return None
+
+# --- 3. HOÁN VỊ ĐÁP ÁN (MÃ LEHMER) ---
+
+def code_to_permutation(code, n):
+    """Giải mã số nguyên (mã Lehmer) thành hoán vị của range(n)."""
+    digits = []
+    for base in range(1, n + 1):
+        digits.append(code % base)
+        code //= base
+    remaining = list(range(n))
+    return [remaining.pop(d) for d in reversed(digits)]
+
+def random_permutation_code(rng, n):
+    """Sinh ngẫu nhiên mã hoán vị cho n đáp án từ bộ sinh số rng."""
+    return rng.randrange(math.factorial(n))